@@ -0,0 +1,84 @@
+"""Initial schema.
+
+Also brings databases created by the old startup-time create_all/ALTER
+TABLE logic up to date, so existing deployments can run it as-is.
+"""
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("telegram_user_id", sa.String(), nullable=False, unique=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table("products"):
+        op.create_table(
+            "products",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("product_url", sa.Text(), nullable=False),
+            sa.Column("platform", sa.String(), nullable=False),
+            sa.Column("product_name", sa.String(), nullable=True),
+            sa.Column("last_price", sa.Integer(), nullable=True),
+            sa.Column("last_availability", sa.Boolean(), nullable=True),
+            sa.Column("last_offer_hash", sa.String(), nullable=True),
+            sa.Column("last_checked_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("user_id", "product_url", name="uq_user_url"),
+        )
+    # Columns added after the first release
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS preferred_pincode VARCHAR(10)")
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_deliverable BOOLEAN")
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_available_at TIMESTAMP")
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_available_price INTEGER")
+
+    unique_constraints = {c["name"] for c in inspector.get_unique_constraints("products")}
+    if "uq_user_url" not in unique_constraints:
+        indexes = {i["name"] for i in inspector.get_indexes("products")}
+        if "uq_user_url" in indexes:
+            # Earlier startup code created it as a bare unique index
+            op.execute("ALTER TABLE products ADD CONSTRAINT uq_user_url UNIQUE USING INDEX uq_user_url")
+        else:
+            # Older databases never enforced uniqueness. Keep the first row of
+            # each (user_id, product_url) pair and drop the rest with their
+            # offers, otherwise the constraint cannot be created.
+            duplicates = (
+                "SELECT dup.id FROM products dup JOIN products kept"
+                " ON kept.user_id = dup.user_id"
+                " AND kept.product_url = dup.product_url"
+                " AND kept.id < dup.id"
+            )
+            if inspector.has_table("bank_offers"):
+                op.execute(f"DELETE FROM bank_offers WHERE product_id IN ({duplicates})")
+            op.execute(f"DELETE FROM products WHERE id IN ({duplicates})")
+            op.create_unique_constraint("uq_user_url", "products", ["user_id", "product_url"])
+
+    if not inspector.has_table("bank_offers"):
+        op.create_table(
+            "bank_offers",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), nullable=False),
+            sa.Column("bank_name", sa.String(), nullable=False),
+            sa.Column("card_type", sa.String(), nullable=True),
+            sa.Column("discount_value", sa.Integer(), nullable=True),
+            sa.Column("min_transaction_amount", sa.Integer(), nullable=True),
+            sa.Column("offer_hash", sa.String(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("bank_offers")
+    op.drop_table("products")
+    op.drop_table("users")
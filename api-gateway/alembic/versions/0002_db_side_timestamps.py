@@ -0,0 +1,45 @@
+"""Generate created_at / last_checked_at in the database as timestamptz.
+
+Existing naive values were written with datetime.utcnow(), so they are
+interpreted as UTC during the conversion.
+"""
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.alter_column(
+        "users",
+        "created_at",
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=sa.func.now(),
+    )
+    op.alter_column(
+        "products",
+        "last_checked_at",
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="last_checked_at AT TIME ZONE 'UTC'",
+    )
+
+
+def downgrade():
+    op.alter_column(
+        "products",
+        "last_checked_at",
+        type_=sa.DateTime(),
+        postgresql_using="last_checked_at AT TIME ZONE 'UTC'",
+    )
+    op.alter_column(
+        "users",
+        "created_at",
+        type_=sa.DateTime(),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=None,
+    )
@@ -0,0 +1,35 @@
+"""Index bank_offers.product_id.
+
+selectinload(Product.bank_offers) and the offer replacement in PATCH
+/products both filter on it. products.user_id needs no index of its own: it
+is the leading column of uq_user_url.
+"""
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bank_offers_product_id",
+            "bank_offers",
+            ["product_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bank_offers_product_id",
+            table_name="bank_offers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
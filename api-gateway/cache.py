@@ -0,0 +1,50 @@
+import logging
+import os
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+PRODUCTS_CACHE_TTL_SECONDS = int(os.getenv("PRODUCTS_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "3600"))
+
+# from_url builds a connection pool shared by every request in this process.
+# Short socket timeouts keep a slow or missing Redis from stalling requests;
+# every cache failure degrades to a plain database read.
+redis_client = Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def user_products_key(telegram_user_id: str) -> str:
+    return f"user:{telegram_user_id}:products"
+
+
+def user_key(user_db_id: int) -> str:
+    return f"user:db:{user_db_id}"
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    try:
+        return await redis_client.get(key)
+    except RedisError as exc:
+        logger.warning("Cache read failed for %s: %s", key, exc)
+        return None
+
+
+async def cache_set(key: str, value: bytes, ttl: int) -> None:
+    try:
+        await redis_client.setex(key, ttl, value)
+    except RedisError as exc:
+        logger.warning("Cache write failed for %s: %s", key, exc)
+
+
+async def cache_delete(*keys: str) -> None:
+    try:
+        await redis_client.delete(*keys)
+    except RedisError as exc:
+        logger.warning("Cache invalidation failed for %s: %s", ", ".join(keys), exc)
@@ -1,16 +1,29 @@
-import os
 import logging
+import re
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from datetime import datetime
 from typing import Optional, List
 
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import TypeAdapter
 from dotenv import load_dotenv
-from urllib.parse import urlparse, urlunparse
 
-from database import engine, get_db, Base
+from cache import (
+    PRODUCTS_CACHE_TTL_SECONDS,
+    USER_CACHE_TTL_SECONDS,
+    cache_delete,
+    cache_get,
+    cache_set,
+    redis_client,
+    user_key,
+    user_products_key,
+)
+from database import engine, async_session, get_db
 from models import User, Product, BankOffer
 from schemas import (
     TrackRequest,
@@ -18,7 +31,6 @@ from schemas import (
     ProductUpdate,
     UserCreate,
     UserResponse,
-    BankOfferSchema,
 )
 
 load_dotenv()
@@ -32,55 +44,45 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Creating database tables if they do not exist...")
-    Base.metadata.create_all(bind=engine)
-    with engine.begin() as conn:
-        conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS preferred_pincode VARCHAR(10)"))
-        conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_deliverable BOOLEAN"))
-        conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_available_at TIMESTAMP"))
-        conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS last_available_price INTEGER"))
-    logger.info("Database tables ready.")
+    # Schema changes are applied by `alembic upgrade head` before the server
+    # starts; here we only open a pooled connection ahead of the first request.
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    logger.info("Database connection pool ready.")
     yield
+    await redis_client.aclose()
+    await engine.dispose()
 
 
-app = FastAPI(title="API Gateway", version="1.0.0", lifespan=lifespan)
-
-
-def detect_platform(url: str) -> Optional[str]:
-    try:
-        from urllib.parse import urlparse
-        parsed = urlparse(url)
-        host = parsed.netloc.lower()
-        # Strip port if present (e.g., "flipkart.com:443" → "flipkart.com")
-        host = host.split(":")[0]
-        if host == "flipkart.com" or host.endswith(".flipkart.com") or host == "fkrt.it":
-            return "flipkart"
-        if host == "shop.vivo.com" or host.endswith(".shop.vivo.com"):
-            return "vivo"
-    except Exception:
-        pass
-    return None
-
-
-def normalize_product_url(url: str) -> str:
-    parsed = urlparse(url.strip())
-    normalized_path = parsed.path.rstrip("/") or "/"
-    return urlunparse(
-        (
-            parsed.scheme.lower(),
-            parsed.netloc.lower(),
-            normalized_path,
-            "",
-            "",
-            "",
-        )
-    )
+app = FastAPI(
+    title="API Gateway",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+_USER = TypeAdapter(UserResponse)
+_PRODUCT = TypeAdapter(ProductResponse)
+_PRODUCT_LIST = TypeAdapter(List[ProductResponse])
+
+
+def encode_json(adapter: TypeAdapter, obj) -> bytes:
+    """Validate ORM attributes once and serialize straight to JSON bytes."""
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    # A plain Response skips FastAPI's second pass over the response_model
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+_NON_DIGITS_RE = re.compile(r"\D+")
 
 
 def normalize_pincode(pincode: Optional[str]) -> Optional[str]:
     if pincode is None:
         return None
-    cleaned = "".join(ch for ch in str(pincode).strip() if ch.isdigit())
+    cleaned = _NON_DIGITS_RE.sub("", str(pincode).strip())
     if cleaned == "":
         return None
     if len(cleaned) != 6:
@@ -88,141 +90,238 @@ def normalize_pincode(pincode: Optional[str]) -> Optional[str]:
     return cleaned
 
 
+async def get_or_create_user(db: AsyncSession, telegram_user_id: str) -> tuple[User, bool]:
+    """Upsert the user in one round-trip; returns (user, created)."""
+    user = await db.scalar(
+        pg_insert(User)
+        .values(telegram_user_id=telegram_user_id)
+        .on_conflict_do_nothing(index_elements=["telegram_user_id"])
+        .returning(User)
+    )
+    if user is not None:
+        return user, True
+    user = await db.scalar(select(User).where(User.telegram_user_id == telegram_user_id))
+    return user, False
+
+
+# telegram_user_id -> users.id. Only committed rows are cached: users are
+# never deleted or renumbered, so those entries stay valid. The bound only
+# keeps memory flat per worker.
+USER_ID_CACHE_SIZE = 10_000
+_user_ids: "OrderedDict[str, int]" = OrderedDict()
+
+
+async def resolve_user_id(db: AsyncSession, telegram_user_id: str) -> tuple[int, bool]:
+    """Return (users.id, created), skipping the database for repeat senders.
+
+    A freshly resolved id is not cached here; call remember_user_id once the
+    transaction that may have inserted the user has committed.
+    """
+    user_id = _user_ids.get(telegram_user_id)
+    if user_id is not None:
+        _user_ids.move_to_end(telegram_user_id)
+        return user_id, False
+    user, created = await get_or_create_user(db, telegram_user_id)
+    return user.id, created
+
+
+def remember_user_id(telegram_user_id: str, user_id: int) -> None:
+    """Cache a users.id that is known to be committed."""
+    _user_ids[telegram_user_id] = user_id
+    _user_ids.move_to_end(telegram_user_id)
+    if len(_user_ids) > USER_ID_CACHE_SIZE:
+        _user_ids.popitem(last=False)
+
+
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @app.post("/users", response_model=UserResponse)
-def create_or_get_user(payload: UserCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.telegram_user_id == payload.telegram_user_id).first()
-    if not user:
-        user = User(telegram_user_id=payload.telegram_user_id)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+async def create_or_get_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    user, created = await get_or_create_user(db, payload.telegram_user_id)
+    await db.commit()
+    if created:
         logger.info("Created new user: %s", payload.telegram_user_id)
-    return user
+    return json_response(encode_json(_USER, user))
 
 
 @app.get("/users/{user_db_id}", response_model=UserResponse)
-def get_user_by_db_id(user_db_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_db_id).first()
+async def get_user_by_db_id(user_db_id: int, db: AsyncSession = Depends(get_db)):
+    key = user_key(user_db_id)
+    cached = await cache_get(key)
+    if cached is not None:
+        return json_response(cached)
+
+    user = await db.get(User, user_db_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    body = encode_json(_USER, user)
+    await cache_set(key, body, USER_CACHE_TTL_SECONDS)
+    return json_response(body)
 
 
 @app.post("/track", response_model=ProductResponse, status_code=201)
-def track_product(payload: TrackRequest, db: Session = Depends(get_db)):
-    normalized_url = normalize_product_url(payload.url)
+async def track_product(payload: TrackRequest):
+    normalized_url = payload.normalized_url
     normalized_pincode = normalize_pincode(payload.pincode)
-    platform = detect_platform(normalized_url)
+    platform = payload.platform
     if platform is None:
         raise HTTPException(
             status_code=400,
             detail="Unsupported URL. Only flipkart.com, fkrt.it, and shop.vivo.com/in are supported.",
         )
 
-    # Get or create user
-    user = db.query(User).filter(User.telegram_user_id == payload.telegram_user_id).first()
-    if not user:
-        user = User(telegram_user_id=payload.telegram_user_id)
-        db.add(user)
-        db.flush()
-        logger.info("Auto-created user: %s", payload.telegram_user_id)
+    # Keep the connection checked out only for the DB work itself
+    async with async_session() as db:
+        user_id, created_user = await resolve_user_id(db, payload.telegram_user_id)
 
-    # Check for duplicate tracking
-    existing = (
-        db.query(Product)
-        .filter(Product.user_id == user.id, Product.product_url == normalized_url)
-        .first()
-    )
-    if existing:
-        if existing.preferred_pincode != normalized_pincode:
-            existing.preferred_pincode = normalized_pincode
-            db.commit()
-            db.refresh(existing)
-        logger.info("Product already tracked: %s", normalized_url)
-        return existing
-
-    product = Product(
-        user_id=user.id,
-        product_url=normalized_url,
-        platform=platform,
-        preferred_pincode=normalized_pincode,
-    )
-    db.add(product)
-    db.commit()
-    db.refresh(product)
-    logger.info("Started tracking product id=%d url=%s platform=%s", product.id, payload.url, platform)
-    return product
+        # Insert, or refresh the pincode of an already tracked URL, atomically
+        upsert = pg_insert(Product).values(
+            user_id=user_id,
+            product_url=normalized_url,
+            platform=platform,
+            preferred_pincode=normalized_pincode,
+        )
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["user_id", "product_url"],
+            set_={"preferred_pincode": upsert.excluded.preferred_pincode},
+        )
+        product = await db.scalar(
+            upsert.returning(Product).options(selectinload(Product.bank_offers))
+        )
+        await db.commit()
+
+    remember_user_id(payload.telegram_user_id, user_id)
+    await cache_delete(user_products_key(payload.telegram_user_id))
+    if created_user:
+        logger.info("Auto-created user: %s", payload.telegram_user_id)
+    logger.info("Tracking product id=%d url=%s platform=%s", product.id, payload.url, platform)
+    return json_response(encode_json(_PRODUCT, product), status_code=201)
 
 
 @app.get("/products", response_model=List[ProductResponse])
-def list_products(user_id: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(Product)
+async def list_products(user_id: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)):
+    stmt = select(Product).options(selectinload(Product.bank_offers))
+    if not user_id:
+        # Unfiltered listing feeds the scheduler, which needs fresh hashes
+        return json_response(encode_json(_PRODUCT_LIST, (await db.scalars(stmt)).all()))
+
+    key = user_products_key(user_id)
+    cached = await cache_get(key)
+    if cached is not None:
+        return json_response(cached)
+
+    products = (
+        await db.scalars(
+            stmt.join(User, User.id == Product.user_id).where(User.telegram_user_id == user_id)
+        )
+    ).all()
+    body = encode_json(_PRODUCT_LIST, products)
+    await cache_set(key, body, PRODUCTS_CACHE_TTL_SECONDS)
+    return json_response(body)
+
+
+@app.get("/products/{product_id}", response_model=ProductResponse)
+async def get_product(
+    product_id: int, user_id: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)
+):
+    stmt = select(Product).options(selectinload(Product.bank_offers)).where(Product.id == product_id)
     if user_id:
-        user = db.query(User).filter(User.telegram_user_id == user_id).first()
-        if not user:
-            return []
-        query = query.filter(Product.user_id == user.id)
-    products = query.all()
-    return products
+        # Only the owner may see it; someone else's product is simply not found
+        stmt = stmt.join(User, User.id == Product.user_id).where(User.telegram_user_id == user_id)
+    product = await db.scalar(stmt)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return json_response(encode_json(_PRODUCT, product))
 
 
 @app.delete("/products/{product_id}", status_code=204)
-def delete_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
+    telegram_user_id = await db.scalar(
+        select(User.telegram_user_id)
+        .join(Product, Product.user_id == User.id)
+        .where(Product.id == product_id)
+    )
+    if telegram_user_id is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    db.delete(product)
-    db.commit()
+    # Set-based deletes: the ORM cascade would load every bank offer first
+    await db.execute(
+        delete(BankOffer).where(BankOffer.product_id == product_id),
+        execution_options={"synchronize_session": False},
+    )
+    await db.execute(
+        delete(Product).where(Product.id == product_id),
+        execution_options={"synchronize_session": False},
+    )
+    await db.commit()
+    await cache_delete(user_products_key(telegram_user_id))
     logger.info("Deleted product id=%d", product_id)
 
 
 @app.patch("/products/{product_id}", response_model=ProductResponse)
-def update_product(product_id: int, payload: ProductUpdate, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    if payload.product_name is not None:
-        product.product_name = payload.product_name
-    if payload.preferred_pincode is not None:
-        product.preferred_pincode = normalize_pincode(payload.preferred_pincode)
-    if payload.last_price is not None:
-        product.last_price = payload.last_price
-    if payload.last_availability is not None:
-        product.last_availability = payload.last_availability
-    if payload.last_deliverable is not None:
-        product.last_deliverable = payload.last_deliverable
-    if payload.last_available_at is not None:
-        product.last_available_at = payload.last_available_at
-    if payload.last_available_price is not None:
-        product.last_available_price = payload.last_available_price
-    if payload.last_offer_hash is not None:
-        product.last_offer_hash = payload.last_offer_hash
-
-    product.last_checked_at = datetime.utcnow()
-
-    # Replace bank offers if provided
-    if payload.bank_offers is not None:
-        for offer in product.bank_offers:
-            db.delete(offer)
-        db.flush()
-        for offer_data in payload.bank_offers:
-            bank_offer = BankOffer(
-                product_id=product.id,
-                bank_name=offer_data.get("bank_name", ""),
-                card_type=offer_data.get("card_type"),
-                discount_value=offer_data.get("discount_value"),
-                min_transaction_amount=offer_data.get("min_transaction_amount"),
-                offer_hash=offer_data.get("offer_hash", ""),
+async def update_product(product_id: int, payload: ProductUpdate):
+    preferred_pincode = normalize_pincode(payload.preferred_pincode)
+
+    # Keep the connection checked out only for the DB work itself
+    async with async_session() as db:
+        stmt = (
+            select(Product, User.telegram_user_id)
+            .join(User, User.id == Product.user_id)
+            .where(Product.id == product_id)
+        )
+        if payload.bank_offers is None:
+            stmt = stmt.options(selectinload(Product.bank_offers))
+        row = (await db.execute(stmt)).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Product not found")
+        product, telegram_user_id = row
+
+        if payload.product_name is not None:
+            product.product_name = payload.product_name
+        if preferred_pincode is not None:
+            product.preferred_pincode = preferred_pincode
+        if payload.last_price is not None:
+            product.last_price = payload.last_price
+        if payload.last_availability is not None:
+            product.last_availability = payload.last_availability
+        if payload.last_deliverable is not None:
+            product.last_deliverable = payload.last_deliverable
+        if payload.last_available_at is not None:
+            product.last_available_at = payload.last_available_at
+        if payload.last_available_price is not None:
+            product.last_available_price = payload.last_available_price
+        if payload.last_offer_hash is not None:
+            product.last_offer_hash = payload.last_offer_hash
+
+        # Stamped by the database; set explicitly so a check that changes no
+        # other column still records when it ran
+        product.last_checked_at = func.now()
+
+        # Replace bank offers if provided: one DELETE and one batched INSERT
+        if payload.bank_offers is not None:
+            await db.execute(
+                delete(BankOffer).where(BankOffer.product_id == product.id),
+                execution_options={"synchronize_session": False},
             )
-            db.add(bank_offer)
-
-    db.commit()
-    db.refresh(product)
+            rows = [
+                {
+                    "product_id": product.id,
+                    "bank_name": offer_data.get("bank_name", ""),
+                    "card_type": offer_data.get("card_type"),
+                    "discount_value": offer_data.get("discount_value"),
+                    "min_transaction_amount": offer_data.get("min_transaction_amount"),
+                    "offer_hash": offer_data.get("offer_hash", ""),
+                }
+                for offer_data in payload.bank_offers
+            ]
+            if rows:
+                await db.execute(insert(BankOffer), rows)
+            await db.refresh(product, attribute_names=["bank_offers"])
+
+        await db.commit()
+
+    await cache_delete(user_products_key(telegram_user_id))
     logger.info("Updated product id=%d", product_id)
-    return product
+    return json_response(encode_json(_PRODUCT, product))
@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
 
 from database import Base
 
@@ -10,13 +9,18 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_user_id = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Fetch server-generated timestamps via RETURNING instead of expiring them
+    __mapper_args__ = {"eager_defaults": True}
 
     products = relationship("Product", back_populates="user", cascade="all, delete-orphan")
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (UniqueConstraint("user_id", "product_url", name="uq_user_url"),)
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -30,17 +34,21 @@ class Product(Base):
     last_available_at = Column(DateTime, nullable=True)
     last_available_price = Column(Integer, nullable=True)
     last_offer_hash = Column(String, nullable=True)
-    last_checked_at = Column(DateTime, nullable=True)
+    last_checked_at = Column(DateTime(timezone=True), nullable=True, onupdate=func.now())
 
     user = relationship("User", back_populates="products")
-    bank_offers = relationship("BankOffer", back_populates="product", cascade="all, delete-orphan")
+    # Must be eager-loaded (selectinload) explicitly; lazy loads would be N+1
+    # queries and cannot run under AsyncSession anyway.
+    bank_offers = relationship(
+        "BankOffer", back_populates="product", cascade="all, delete-orphan", lazy="raise_on_sql"
+    )
 
 
 class BankOffer(Base):
     __tablename__ = "bank_offers"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     bank_name = Column(String, nullable=False)
     card_type = Column(String, nullable=True)
     discount_value = Column(Integer, nullable=True)
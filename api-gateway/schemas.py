@@ -1,13 +1,47 @@
-from pydantic import BaseModel, HttpUrl
+import re
+
+from pydantic import BaseModel, HttpUrl, PrivateAttr, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 
+from urls import detect_platform, normalize_product_url
+
+_SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
 
 class TrackRequest(BaseModel):
-    url: str
+    url: HttpUrl
     telegram_user_id: str
     pincode: Optional[str] = None
 
+    # Derived once from the parsed URL; platform is None for unsupported hosts
+    _normalized_url: str = PrivateAttr()
+    _platform: Optional[str] = PrivateAttr()
+
+    @field_validator("url", mode="before")
+    @classmethod
+    def default_scheme(cls, value):
+        # Links pasted into Telegram often lack the scheme
+        if isinstance(value, str):
+            value = value.strip()
+            if not _SCHEME_RE.match(value):
+                value = f"https://{value}"
+        return value
+
+    @model_validator(mode="after")
+    def derive_url_fields(self):
+        self._normalized_url = normalize_product_url(self.url)
+        self._platform = detect_platform(self.url.host)
+        return self
+
+    @property
+    def normalized_url(self) -> str:
+        return self._normalized_url
+
+    @property
+    def platform(self) -> Optional[str]:
+        return self._platform
+
 
 class BankOfferSchema(BaseModel):
     bank_name: str
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from pydantic import HttpUrl
+
+_PLATFORM_BY_HOST = {
+    "flipkart.com": "flipkart",
+    "fkrt.it": "flipkart",
+    "shop.vivo.com": "vivo",
+}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def detect_platform(host: Optional[str]) -> Optional[str]:
+    """Map a lowercase host (or any subdomain of a supported one) to its platform."""
+    if not host:
+        return None
+    for domain, platform in _PLATFORM_BY_HOST.items():
+        if host == domain or host.endswith("." + domain):
+            return platform
+    return None
+
+
+def normalize_product_url(url: HttpUrl) -> str:
+    """Rebuild an already parsed URL without query, fragment or trailing slash."""
+    netloc = url.host
+    if url.port is not None and url.port != _DEFAULT_PORTS.get(url.scheme):
+        netloc = f"{netloc}:{url.port}"
+    path = (url.path or "/").rstrip("/") or "/"
+    return f"{url.scheme}://{netloc}{path}"
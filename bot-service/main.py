@@ -4,8 +4,9 @@ import os
 from datetime import datetime
 
 from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 import httpx
+import uvloop
 from dotenv import load_dotenv
 
 from notify_server import start_notify_server
@@ -27,6 +28,19 @@ if not TELEGRAM_BOT_TOKEN:
 bot = Bot(token=TELEGRAM_BOT_TOKEN)
 dp = Dispatcher()
 
+# One keep-alive pool for every handler instead of a new connection per command
+api_client = httpx.AsyncClient(
+    base_url=API_GATEWAY_URL,
+    timeout=15,
+    # Expire idle connections before the gateway's 75s keep-alive does
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60),
+)
+
+
+@dp.shutdown()
+async def close_api_client():
+    await api_client.aclose()
+
 
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
@@ -42,14 +56,14 @@ async def cmd_start(message: types.Message):
 
 
 @dp.message(Command("track"))
-async def cmd_track(message: types.Message):
-    parts = message.text.split(maxsplit=2)
-    if len(parts) < 2 or not parts[1].strip():
+async def cmd_track(message: types.Message, command: CommandObject):
+    args = (command.args or "").split(maxsplit=1)
+    if not args:
         await message.answer("Usage: /track <product_url> [pincode]")
         return
 
-    url = parts[1].strip()
-    pincode = parts[2].strip() if len(parts) > 2 else None
+    url = args[0]
+    pincode = args[1].strip() if len(args) > 1 else None
     if pincode:
         pincode_digits = "".join(ch for ch in pincode if ch.isdigit())
         if len(pincode_digits) != 6:
@@ -60,11 +74,10 @@ async def cmd_track(message: types.Message):
     telegram_user_id = str(message.from_user.id)
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.post(
-                f"{API_GATEWAY_URL}/track",
-                json={"url": url, "telegram_user_id": telegram_user_id, "pincode": pincode},
-            )
+        resp = await api_client.post(
+            "/track",
+            json={"url": url, "telegram_user_id": telegram_user_id, "pincode": pincode},
+        )
         if resp.status_code in (200, 201):
             data = resp.json()
             pincode_info = f"\nPincode: {data.get('preferred_pincode')}" if data.get("preferred_pincode") else ""
@@ -74,6 +87,8 @@ async def cmd_track(message: types.Message):
         elif resp.status_code == 400:
             detail = resp.json().get("detail", "Invalid URL")
             await message.answer(f"❌ {detail}")
+        elif resp.status_code == 422:
+            await message.answer("❌ Invalid URL. Send a full product link.")
         else:
             logger.error("Track error: %s %s", resp.status_code, resp.text)
             await message.answer("❌ Failed to track product. Please try again later.")
@@ -86,11 +101,7 @@ async def cmd_track(message: types.Message):
 async def cmd_list(message: types.Message):
     telegram_user_id = str(message.from_user.id)
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(
-                f"{API_GATEWAY_URL}/products",
-                params={"user_id": telegram_user_id},
-            )
+        resp = await api_client.get("/products", params={"user_id": telegram_user_id})
         if resp.status_code == 200:
             products = resp.json()
             if not products:
@@ -126,31 +137,26 @@ async def cmd_list(message: types.Message):
 
 
 @dp.message(Command("status"))
-async def cmd_status(message: types.Message):
-    parts = message.text.split(maxsplit=1)
-    if len(parts) < 2 or not parts[1].strip().isdigit():
+async def cmd_status(message: types.Message, command: CommandObject):
+    arg = (command.args or "").strip()
+    if not arg.isdigit():
         await message.answer("Usage: /status <product_id>")
         return
 
-    product_id = int(parts[1].strip())
+    product_id = int(arg)
     telegram_user_id = str(message.from_user.id)
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(
-                f"{API_GATEWAY_URL}/products",
-                params={"user_id": telegram_user_id},
-            )
+        resp = await api_client.get(f"/products/{product_id}", params={"user_id": telegram_user_id})
 
+        if resp.status_code == 404:
+            await message.answer(f"❌ Product {product_id} not found.")
+            return
         if resp.status_code != 200:
             await message.answer("❌ Failed to fetch product status.")
             return
 
-        products = resp.json()
-        product = next((p for p in products if p.get("id") == product_id), None)
-        if product is None:
-            await message.answer(f"❌ Product {product_id} not found.")
-            return
+        product = resp.json()
 
         availability = product.get("last_availability")
         availability_text = "✅ In Stock" if availability is True else ("❌ Out of Stock" if availability is False else "❓ Unknown")
@@ -176,16 +182,14 @@ async def cmd_status(message: types.Message):
 
 
 @dp.message(Command("remove"))
-async def cmd_remove(message: types.Message):
-    parts = message.text.split(maxsplit=1)
-    if len(parts) < 2 or not parts[1].strip().isdigit():
+async def cmd_remove(message: types.Message, command: CommandObject):
+    product_id = (command.args or "").strip()
+    if not product_id.isdigit():
         await message.answer("Usage: /remove <product_id>")
         return
 
-    product_id = parts[1].strip()
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.delete(f"{API_GATEWAY_URL}/products/{product_id}")
+        resp = await api_client.delete(f"/products/{product_id}")
         if resp.status_code == 204:
             await message.answer(f"🗑️ Product {product_id} removed from tracking.")
         elif resp.status_code == 404:
@@ -223,4 +227,4 @@ def _format_last_instock(product: dict) -> str:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    uvloop.run(main())
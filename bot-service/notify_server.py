@@ -1,25 +1,68 @@
 import asyncio
 import logging
+import os
 from aiohttp import web
+from aiogram.exceptions import TelegramRetryAfter
 
 logger = logging.getLogger(__name__)
 
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "20"))
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "10000"))
+SEND_TIMEOUT = 15
+MAX_SEND_ATTEMPTS = 3
+
+
+async def send_notification(bot, chat_id, message_text: str):
+    for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+        try:
+            await asyncio.wait_for(bot.send_message(chat_id=chat_id, text=message_text), SEND_TIMEOUT)
+            logger.info("Notification sent to chat_id=%s", chat_id)
+            return
+        except TelegramRetryAfter as exc:
+            # Flood control: Telegram says exactly how long to back off
+            logger.warning(
+                "Rate limited sending to chat_id=%s, retrying in %ss (attempt %d)",
+                chat_id, exc.retry_after, attempt,
+            )
+            await asyncio.sleep(exc.retry_after)
+        except asyncio.TimeoutError:
+            # The message may still have been delivered; don't risk a duplicate
+            logger.error("Timed out sending notification to chat_id=%s", chat_id)
+            return
+        except Exception as exc:
+            logger.error("Error sending notification to chat_id=%s: %s", chat_id, exc)
+            return
+    logger.error("Giving up on notification to chat_id=%s after %d attempts", chat_id, MAX_SEND_ATTEMPTS)
+
+
+async def notify_worker(bot, queue: asyncio.Queue):
+    while True:
+        chat_id, message_text = await queue.get()
+        try:
+            await send_notification(bot, chat_id, message_text)
+        finally:
+            queue.task_done()
+
 
 async def handle_notify(request):
     try:
         data = await request.json()
-        chat_id = data.get("chat_id")
-        message_text = data.get("message", "")
-        if not chat_id or not message_text:
-            return web.json_response({"error": "chat_id and message are required"}, status=400)
-
-        bot = request.app["bot"]
-        await bot.send_message(chat_id=chat_id, text=message_text)
-        logger.info("Notification sent to chat_id=%s", chat_id)
-        return web.json_response({"status": "sent"})
     except Exception as exc:
-        logger.error("Error sending notification: %s", exc)
-        return web.json_response({"error": str(exc)}, status=500)
+        logger.error("Invalid notify payload: %s", exc)
+        return web.json_response({"error": "invalid JSON body"}, status=400)
+
+    chat_id = data.get("chat_id")
+    message_text = data.get("message", "")
+    if not chat_id or not message_text:
+        return web.json_response({"error": "chat_id and message are required"}, status=400)
+
+    # Sending happens on the worker pool so Telegram latency overlaps across users
+    try:
+        request.app["notify_queue"].put_nowait((chat_id, message_text))
+    except asyncio.QueueFull:
+        logger.error("Notify queue full, rejecting notification for chat_id=%s", chat_id)
+        return web.json_response({"error": "notify queue full"}, status=503)
+    return web.json_response({"status": "queued"}, status=202)
 
 
 async def handle_health(request):
@@ -27,8 +70,12 @@ async def handle_health(request):
 
 
 async def start_notify_server(bot):
+    queue = asyncio.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+    workers = [asyncio.create_task(notify_worker(bot, queue)) for _ in range(NOTIFY_WORKERS)]
+
     app = web.Application()
     app["bot"] = bot
+    app["notify_queue"] = queue
     app.router.add_post("/notify", handle_notify)
     app.router.add_get("/health", handle_health)
 
@@ -36,8 +83,13 @@ async def start_notify_server(bot):
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8080)
     await site.start()
-    logger.info("Notify server listening on port 8080")
+    logger.info("Notify server listening on port 8080 with %d send workers", NOTIFY_WORKERS)
 
     # Keep running indefinitely
-    while True:
-        await asyncio.sleep(3600)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await runner.cleanup()
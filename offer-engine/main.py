@@ -1,11 +1,11 @@
 import logging
 from typing import List, Optional, Union
 
-from fastapi import FastAPI
-from pydantic import BaseModel
+import msgspec
+from fastapi import FastAPI, Request, Response
 from dotenv import load_dotenv
 
-from normalizer import normalize_offers, compute_hash
+from normalizer import normalize_offers, compute_hash, compute_legacy_hash, with_offer_hashes
 
 load_dotenv()
 
@@ -18,7 +18,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="Offer Engine", version="1.0.0")
 
 
-class OfferItem(BaseModel):
+# msgspec decodes request bytes straight into these structs, which is much
+# cheaper than pydantic validation on the per-product hot path
+class OfferItem(msgspec.Struct):
     bank_name: str
     card_type: Optional[str] = None
     discount_value: Optional[Union[int, str]] = None
@@ -26,12 +28,12 @@ class OfferItem(BaseModel):
     min_transaction_amount: Optional[Union[int, str]] = None
 
 
-class AnalyzeRequest(BaseModel):
+class AnalyzeRequest(msgspec.Struct):
     offers: List[OfferItem] = []
     previous_hash: Optional[str] = None
 
 
-class AnalyzeResponse(BaseModel):
+class AnalyzeResponse(msgspec.Struct):
     changed: bool
     change_type: Optional[str]
     new_hash: str
@@ -39,17 +41,51 @@ class AnalyzeResponse(BaseModel):
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(payload: AnalyzeRequest):
-    raw_offers = [o.model_dump() for o in payload.offers]
+_ANALYZE_DECODER = msgspec.json.Decoder(AnalyzeRequest)
+_ANALYZE_BATCH_DECODER = msgspec.json.Decoder(List[AnalyzeRequest])
+_ENCODER = msgspec.json.Encoder()
+
+
+def _json(body: bytes, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def _invalid(exc: msgspec.DecodeError) -> Response:
+    # Same status FastAPI uses for a body that fails validation
+    return _json(_ENCODER.encode({"detail": str(exc)}), status_code=422)
+
+
+@app.post("/analyze")
+async def analyze(request: Request):
+    try:
+        payload = _ANALYZE_DECODER.decode(await request.body())
+    except msgspec.DecodeError as exc:
+        return _invalid(exc)
+    return _json(_ENCODER.encode(_analyze(payload)))
+
+
+@app.post("/analyze_batch")
+async def analyze_batch(request: Request):
+    """Analyze many offer sets in one call; results align with the request by index."""
+    try:
+        payload = _ANALYZE_BATCH_DECODER.decode(await request.body())
+    except msgspec.DecodeError as exc:
+        return _invalid(exc)
+    return _json(_ENCODER.encode([_analyze(item) for item in payload]))
+
+
+def _analyze(payload: AnalyzeRequest) -> AnalyzeResponse:
+    raw_offers = [msgspec.structs.asdict(o) for o in payload.offers]
     normalized = normalize_offers(raw_offers)
     new_hash = compute_hash(normalized)
 
     changed = new_hash != payload.previous_hash
+    if changed and payload.previous_hash is not None:
+        changed = compute_legacy_hash(normalized) != payload.previous_hash
 
     if changed:
         if payload.previous_hash is None:
@@ -70,5 +106,6 @@ def analyze(payload: AnalyzeRequest):
         changed=changed,
         change_type=change_type,
         new_hash=new_hash,
-        normalized_offers=normalized,
+        # The list hash above covers the offer fields only, not offer_hash
+        normalized_offers=with_offer_hashes(normalized),
     )
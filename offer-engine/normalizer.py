@@ -1,7 +1,8 @@
 import hashlib
 import json
 import logging
-import re
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +12,9 @@ def strip_currency(value) -> int:
     if value is None:
         return 0
     text = str(value)
-    cleaned = re.sub(r"[₹,\s]", "", text)
-    cleaned = re.sub(r"[^\d]", "", cleaned)
+    # isdecimal() keeps exactly what int() accepts (isdigit() would also let
+    # through superscripts)
+    cleaned = "".join(ch for ch in text if ch.isdecimal())
     return int(cleaned) if cleaned else 0
 
 
@@ -33,7 +35,24 @@ def normalize_offers(offers: list) -> list:
     return normalized
 
 
+def with_offer_hashes(normalized_offers: list) -> list:
+    """Return copies of the offers, each carrying the SHA-256 of its own fields."""
+    return [
+        {**offer, "offer_hash": hashlib.sha256(orjson.dumps(offer, option=orjson.OPT_SORT_KEYS)).hexdigest()}
+        for offer in normalized_offers
+    ]
+
+
 def compute_hash(normalized_offers: list) -> str:
     """Compute a SHA-256 hash of the sorted, serialized offers list."""
+    return hashlib.sha256(orjson.dumps(normalized_offers, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def compute_legacy_hash(normalized_offers: list) -> str:
+    """Hash as produced before the switch to orjson (json.dumps separators).
+
+    Products checked before the switch still store this form; comparing
+    against it keeps their first check afterwards from looking like a change.
+    """
     serialized = json.dumps(normalized_offers, sort_keys=True, ensure_ascii=False)
     return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
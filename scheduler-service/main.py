@@ -1,11 +1,13 @@
+import asyncio
 import hashlib
-import json
 import logging
 import os
-import time
+import random
 from datetime import datetime
 
 import httpx
+import orjson
+import uvloop
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,194 +29,287 @@ BOT_NOTIFY_URL = os.getenv("BOT_NOTIFY_URL", "http://bot-service:8080/notify")
 
 HTTP_TIMEOUT = 30
 MAX_RETRIES = 3
+# Products checked at once; bounds the load put on scraper-service
+MAX_CONCURRENT_CHECKS = int(os.getenv("MAX_CONCURRENT_CHECKS", "16"))
+# Products per /scrape_batch and /analyze_batch call
+CHECK_BATCH_SIZE = max(1, int(os.getenv("CHECK_BATCH_SIZE", "8")))
+# A batch call waits for its slowest scrape, retries included
+BATCH_HTTP_TIMEOUT = 180
+# Bodies are encoded with orjson up front rather than by httpx's json.dumps
+JSON_HEADERS = {"Content-Type": "application/json"}
+# offer-engine's hash of an empty offer list; an empty scrape can't change it
+EMPTY_OFFERS_HASH = hashlib.sha256(b"[]").hexdigest()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Random delay of up to 2s, 4s, ... per attempt (exponential, full jitter).
+
+    Checks run in parallel, so a scraper hiccup fails many of them at once;
+    the jitter keeps their retries from arriving together.
+    """
+    return random.uniform(0, 2 ** (attempt + 1))
 
 
-def http_post_with_retry(url: str, payload: dict) -> httpx.Response:
+async def http_post_with_retry(
+    client: httpx.AsyncClient, url: str, payload, timeout: float = HTTP_TIMEOUT
+) -> httpx.Response:
     last_exc = None
     for attempt in range(MAX_RETRIES):
         try:
-            with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                resp = client.post(url, json=payload)
-                resp.raise_for_status()
-                return resp
+            resp = await client.post(url, content=orjson.dumps(payload), headers=JSON_HEADERS, timeout=timeout)
+            resp.raise_for_status()
+            return resp
         except httpx.HTTPError as exc:
             last_exc = exc
-            wait = 2 ** attempt
-            logger.warning("POST %s failed (attempt %d/%d): %s – retry in %ds", url, attempt + 1, MAX_RETRIES, exc, wait)
-            time.sleep(wait)
+            if attempt + 1 == MAX_RETRIES:
+                break
+            wait = backoff_delay(attempt)
+            logger.warning("POST %s failed (attempt %d/%d): %s – retry in %.1fs", url, attempt + 1, MAX_RETRIES, exc, wait)
+            await asyncio.sleep(wait)
     raise last_exc
 
 
-def http_get_with_retry(url: str, params: dict = None) -> httpx.Response:
+async def http_get_with_retry(client: httpx.AsyncClient, url: str, params: dict = None) -> httpx.Response:
     last_exc = None
     for attempt in range(MAX_RETRIES):
         try:
-            with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                resp = client.get(url, params=params)
-                resp.raise_for_status()
-                return resp
+            resp = await client.get(url, params=params)
+            resp.raise_for_status()
+            return resp
         except httpx.HTTPError as exc:
             last_exc = exc
-            wait = 2 ** attempt
-            logger.warning("GET %s failed (attempt %d/%d): %s – retry in %ds", url, attempt + 1, MAX_RETRIES, exc, wait)
-            time.sleep(wait)
+            if attempt + 1 == MAX_RETRIES:
+                break
+            wait = backoff_delay(attempt)
+            logger.warning("GET %s failed (attempt %d/%d): %s – retry in %.1fs", url, attempt + 1, MAX_RETRIES, exc, wait)
+            await asyncio.sleep(wait)
     raise last_exc
 
 
-def check_products():
+async def check_products(client: httpx.AsyncClient):
     logger.info("Starting product check cycle...")
     try:
-        resp = http_get_with_retry(f"{API_GATEWAY_URL}/products")
-        products = resp.json()
+        resp = await http_get_with_retry(client, f"{API_GATEWAY_URL}/products")
+        products = orjson.loads(resp.content)
     except Exception as exc:
         logger.error("Failed to fetch products from API gateway: %s", exc)
         return
 
     logger.info("Checking %d product(s)", len(products))
 
-    for product in products:
-        product_id = product.get("id")
-        url = product.get("product_url")
-        platform = product.get("platform")
-        previous_hash = product.get("last_offer_hash")
-        user_id = product.get("user_id")
-        preferred_pincode = product.get("preferred_pincode")
+    # Scrape and analyze in batches (one HTTP call each per batch); batches
+    # run side by side since the work is almost entirely network wait
+    batches = [products[i:i + CHECK_BATCH_SIZE] for i in range(0, len(products), CHECK_BATCH_SIZE)]
+    sem = asyncio.Semaphore(max(1, MAX_CONCURRENT_CHECKS // CHECK_BATCH_SIZE))
+    results = await asyncio.gather(
+        *(process_batch(client, sem, batch) for batch in batches),
+        return_exceptions=True,
+    )
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            logger.error(
+                "Check failed for product ids=%s: %s", [p.get("id") for p in batch], result
+            )
+
 
-        logger.info("Checking product id=%s url=%s", product_id, url)
+async def process_batch(client: httpx.AsyncClient, sem: asyncio.Semaphore, batch: list):
+    async with sem:
+        for product in batch:
+            logger.info("Checking product id=%s url=%s", product.get("id"), product.get("product_url"))
 
         # Step 1: Scrape
         try:
-            scrape_resp = http_post_with_retry(
-                f"{SCRAPER_URL}/scrape",
-                {"url": url, "platform": platform, "pincode": preferred_pincode},
+            scrape_resp = await http_post_with_retry(
+                client,
+                f"{SCRAPER_URL}/scrape_batch",
+                [
+                    {
+                        "url": p.get("product_url"),
+                        "platform": p.get("platform"),
+                        "pincode": p.get("preferred_pincode"),
+                    }
+                    for p in batch
+                ],
+                timeout=BATCH_HTTP_TIMEOUT,
             )
-            scrape_data = scrape_resp.json()
+            scraped = orjson.loads(scrape_resp.content)
         except Exception as exc:
-            logger.error("Scrape failed for product id=%s: %s", product_id, exc)
-            continue
-
-        bank_offers = scrape_data.get("bank_offers", [])
-        new_price = scrape_data.get("price")
-        new_name = scrape_data.get("product_name")
-        new_availability = scrape_data.get("availability")
-        new_deliverable = scrape_data.get("deliverable")
-
-        # Step 2: Analyze offers
-        try:
-            analyze_resp = http_post_with_retry(
-                f"{OFFER_ENGINE_URL}/analyze",
-                {"offers": bank_offers, "previous_hash": previous_hash},
+            logger.error("Scrape failed for product ids=%s: %s", [p.get("id") for p in batch], exc)
+            return
+
+        # Step 2: Analyze offers. Still no offers on a product that had none
+        # is answered here; only the rest go to offer-engine.
+        analyzed = [
+            {"changed": False, "change_type": None, "new_hash": EMPTY_OFFERS_HASH, "normalized_offers": []}
+            if not data.get("bank_offers") and p.get("last_offer_hash") == EMPTY_OFFERS_HASH
+            else None
+            for p, data in zip(batch, scraped)
+        ]
+        pending = [i for i, result in enumerate(analyzed) if result is None]
+        if pending:
+            try:
+                analyze_resp = await http_post_with_retry(
+                    client,
+                    f"{OFFER_ENGINE_URL}/analyze_batch",
+                    [
+                        {
+                            "offers": scraped[i].get("bank_offers", []),
+                            "previous_hash": batch[i].get("last_offer_hash"),
+                        }
+                        for i in pending
+                    ],
+                )
+                for i, result in zip(pending, orjson.loads(analyze_resp.content)):
+                    analyzed[i] = result
+            except Exception as exc:
+                logger.error(
+                    "Offer analysis failed for product ids=%s: %s", [batch[i].get("id") for i in pending], exc
+                )
+                for i in pending:
+                    analyzed[i] = {
+                        "changed": False,
+                        "new_hash": batch[i].get("last_offer_hash"),
+                        "normalized_offers": [],
+                    }
+
+        # Steps 3 and 4 are per product: update and notify
+        await asyncio.gather(
+            *(
+                apply_check(client, product, scrape_data, analyze_data)
+                for product, scrape_data, analyze_data in zip(batch, scraped, analyzed)
             )
-            analyze_data = analyze_resp.json()
-        except Exception as exc:
-            logger.error("Offer analysis failed for product id=%s: %s", product_id, exc)
-            analyze_data = {"changed": False, "new_hash": previous_hash, "normalized_offers": []}
-
-        changed = analyze_data.get("changed", False)
-        new_hash = analyze_data.get("new_hash")
-        change_type = analyze_data.get("change_type")
-        normalized_offers = analyze_data.get("normalized_offers", [])
-
-        # Build bank_offers for update (add offer_hash field)
-        offers_for_update = []
-        for offer in normalized_offers:
-            offer_hash = hashlib.sha256(
-                json.dumps(offer, sort_keys=True).encode()
-            ).hexdigest()
-            offers_for_update.append({**offer, "offer_hash": offer_hash})
-
-        # Step 3: Update product in API gateway
-        price_changed = new_price is not None and new_price != product.get("last_price")
-        availability_changed = (
-            new_availability is not None
-            and new_availability != product.get("last_availability")
-        )
-        deliverability_changed = (
-            new_deliverable is not None
-            and new_deliverable != product.get("last_deliverable")
         )
 
-        patch_payload = {
-            "last_offer_hash": new_hash,
-            "bank_offers": offers_for_update,
-        }
-        if new_name:
-            patch_payload["product_name"] = new_name
+
+async def apply_check(client: httpx.AsyncClient, product: dict, scrape_data: dict, analyze_data: dict):
+    product_id = product.get("id")
+    url = product.get("product_url")
+    user_id = product.get("user_id")
+    preferred_pincode = product.get("preferred_pincode")
+
+    new_price = scrape_data.get("price")
+    new_name = scrape_data.get("product_name")
+    new_availability = scrape_data.get("availability")
+    new_deliverable = scrape_data.get("deliverable")
+
+    changed = analyze_data.get("changed", False)
+    new_hash = analyze_data.get("new_hash")
+    change_type = analyze_data.get("change_type")
+    normalized_offers = analyze_data.get("normalized_offers", [])
+
+    # Step 3: Update product in API gateway
+    price_changed = new_price is not None and new_price != product.get("last_price")
+    availability_changed = (
+        new_availability is not None
+        and new_availability != product.get("last_availability")
+    )
+    deliverability_changed = (
+        new_deliverable is not None
+        and new_deliverable != product.get("last_deliverable")
+    )
+
+    # Offers are only rewritten when they changed: the gateway replaces them
+    # with a DELETE and INSERT, and a failed analysis has no offers to send
+    patch_payload = {}
+    if changed:
+        # offer-engine already attaches each offer's offer_hash
+        patch_payload["bank_offers"] = normalized_offers
+    if new_hash and new_hash != product.get("last_offer_hash"):
+        patch_payload["last_offer_hash"] = new_hash
+    if new_name:
+        patch_payload["product_name"] = new_name
+    if new_price is not None:
+        patch_payload["last_price"] = new_price
+    if new_availability is not None:
+        patch_payload["last_availability"] = new_availability
+    if new_deliverable is not None:
+        patch_payload["last_deliverable"] = new_deliverable
+    if new_availability is True:
+        patch_payload["last_available_at"] = datetime.utcnow().isoformat()
         if new_price is not None:
-            patch_payload["last_price"] = new_price
-        if new_availability is not None:
-            patch_payload["last_availability"] = new_availability
-        if new_deliverable is not None:
-            patch_payload["last_deliverable"] = new_deliverable
-        if new_availability is True:
-            patch_payload["last_available_at"] = datetime.utcnow().isoformat()
-            if new_price is not None:
-                patch_payload["last_available_price"] = new_price
+            patch_payload["last_available_price"] = new_price
 
-        try:
-            with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                client.patch(f"{API_GATEWAY_URL}/products/{product_id}", json=patch_payload)
-        except Exception as exc:
-            logger.error("Failed to update product id=%s: %s", product_id, exc)
-
-        # Step 4: Notify user if something changed
-        if not (changed or price_changed or availability_changed or deliverability_changed):
-            continue
-
-        # Build notification message
-        parts = [f"🔔 Update for product: {new_name or url}"]
-        if price_changed:
-            old_price = product.get("last_price")
-            old_price_str = f"₹{old_price}" if old_price is not None else "N/A"
-            parts.append(f"💰 Price: {old_price_str} → ₹{new_price}")
-        if availability_changed:
-            status = "✅ In Stock" if new_availability else "❌ Out of Stock"
-            parts.append(f"📦 Availability: {status}")
-        if deliverability_changed:
-            if preferred_pincode:
-                status = "✅ Deliverable" if new_deliverable else "❌ Not deliverable"
-                parts.append(f"🚚 Deliverability ({preferred_pincode}): {status}")
-            else:
-                status = "✅ Deliverable" if new_deliverable else "❌ Not deliverable"
-                parts.append(f"🚚 Deliverability: {status}")
-        if changed and change_type not in (None, "INITIAL_FETCH"):
-            parts.append(f"🏦 Bank offers changed ({change_type})")
-        parts.append(f"🔗 Link: {url}")
-        notification_text = "\n".join(parts)
-
-        # Resolve chat_id via /users/{user_id} endpoint
-        # (Telegram user IDs == chat IDs for private chats)
-        telegram_user_id = _resolve_telegram_user_id(user_id)
-        if telegram_user_id is None:
-            logger.warning("Could not resolve telegram_user_id for user_id=%s", user_id)
-            continue
+    try:
+        await client.patch(
+            f"{API_GATEWAY_URL}/products/{product_id}",
+            content=orjson.dumps(patch_payload),
+            headers=JSON_HEADERS,
+        )
+    except Exception as exc:
+        logger.error("Failed to update product id=%s: %s", product_id, exc)
 
-        try:
-            http_post_with_retry(
-                BOT_NOTIFY_URL,
-                {"chat_id": telegram_user_id, "message": notification_text},
-            )
-            logger.info("Notification sent to user_id=%s", telegram_user_id)
-        except Exception as exc:
-            logger.error("Failed to notify user %s: %s", telegram_user_id, exc)
+    # Step 4: Notify user if something changed
+    if not (changed or price_changed or availability_changed or deliverability_changed):
+        return
+
+    # Build notification message
+    parts = [f"🔔 Update for product: {new_name or url}"]
+    if price_changed:
+        old_price = product.get("last_price")
+        old_price_str = f"₹{old_price}" if old_price is not None else "N/A"
+        parts.append(f"💰 Price: {old_price_str} → ₹{new_price}")
+    if availability_changed:
+        status = "✅ In Stock" if new_availability else "❌ Out of Stock"
+        parts.append(f"📦 Availability: {status}")
+    if deliverability_changed:
+        if preferred_pincode:
+            status = "✅ Deliverable" if new_deliverable else "❌ Not deliverable"
+            parts.append(f"🚚 Deliverability ({preferred_pincode}): {status}")
+        else:
+            status = "✅ Deliverable" if new_deliverable else "❌ Not deliverable"
+            parts.append(f"🚚 Deliverability: {status}")
+    if changed and change_type not in (None, "INITIAL_FETCH"):
+        parts.append(f"🏦 Bank offers changed ({change_type})")
+    parts.append(f"🔗 Link: {url}")
+    notification_text = "\n".join(parts)
+
+    # Resolve chat_id via /users/{user_id} endpoint
+    # (Telegram user IDs == chat IDs for private chats)
+    telegram_user_id = await _resolve_telegram_user_id(client, user_id)
+    if telegram_user_id is None:
+        logger.warning("Could not resolve telegram_user_id for user_id=%s", user_id)
+        return
 
+    try:
+        await http_post_with_retry(
+            client,
+            BOT_NOTIFY_URL,
+            {"chat_id": telegram_user_id, "message": notification_text},
+        )
+        logger.info("Notification sent to user_id=%s", telegram_user_id)
+    except Exception as exc:
+        logger.error("Failed to notify user %s: %s", telegram_user_id, exc)
 
-def _resolve_telegram_user_id(user_id: int):
+
+# users.id -> telegram_user_id. The mapping never changes once a user
+# exists, so entries are kept for the life of the process.
+_telegram_user_ids: dict[int, str] = {}
+TELEGRAM_ID_CACHE_SIZE = 10_000
+
+
+async def _resolve_telegram_user_id(client: httpx.AsyncClient, user_id: int):
     """
-    Resolve telegram_user_id from the cached products list.
-    We store the telegram_user_id by querying /users endpoint.
+    Resolve telegram_user_id for a users.id via the /users endpoint.
+    Successful lookups are cached, so each user costs one request per process.
     """
+    cached = _telegram_user_ids.get(user_id)
+    if cached is not None:
+        return cached
     try:
-        with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-            resp = client.get(f"{API_GATEWAY_URL}/users/{user_id}")
-            if resp.status_code == 200:
-                return resp.json().get("telegram_user_id")
+        resp = await client.get(f"{API_GATEWAY_URL}/users/{user_id}")
+        if resp.status_code == 200:
+            telegram_user_id = resp.json().get("telegram_user_id")
+            if telegram_user_id is not None:
+                if len(_telegram_user_ids) >= TELEGRAM_ID_CACHE_SIZE:
+                    _telegram_user_ids.clear()
+                _telegram_user_ids[user_id] = telegram_user_id
+            return telegram_user_id
     except Exception as exc:
         logger.error("Failed to resolve telegram_user_id for user_id=%s: %s", user_id, exc)
     return None
 
 
-if __name__ == "__main__":
+async def main():
     if CHECK_INTERVAL_SECONDS <= 0:
         logger.info("Scheduler starting in continuous mode (no interval delay)")
     else:
@@ -223,10 +318,24 @@ if __name__ == "__main__":
             CHECK_INTERVAL_SECONDS,
         )
 
-    logger.info("Running initial product check...")
-    check_products()
+    # One keep-alive pool for the whole process, sized to the check concurrency.
+    # Idle connections expire before the services' 75s keep-alive does, so a
+    # pooled connection is never reused just as the server closes it.
+    limits = httpx.Limits(
+        max_connections=MAX_CONCURRENT_CHECKS * 2,
+        max_keepalive_connections=MAX_CONCURRENT_CHECKS * 2,
+        keepalive_expiry=60,
+    )
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=limits) as client:
+        logger.info("Running initial product check...")
+        await check_products(client)
 
-    while True:
-        if CHECK_INTERVAL_SECONDS > 0:
-            time.sleep(CHECK_INTERVAL_SECONDS)
-        check_products()
+        while True:
+            if CHECK_INTERVAL_SECONDS > 0:
+                await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+            await check_products(client)
+
+
+if __name__ == "__main__":
+    # libuv-backed event loop; cheaper per-socket overhead for the check fan-out
+    uvloop.run(main())
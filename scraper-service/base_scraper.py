@@ -1,8 +1,13 @@
+import asyncio
 import logging
-import time
+import multiprocessing
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, NamedTuple
 
-import requests
+import aiohttp
 
 logger = logging.getLogger(__name__)
 
@@ -17,26 +22,82 @@ HEADERS = {
 }
 
 
+# Product pages are well under this; anything past it is not worth parsing
+MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+_CHUNK_SIZE = 64 * 1024
+
+
+class FetchedPage(NamedTuple):
+    body: bytes
+    url: str  # final URL after redirects
+    encoding: str | None  # charset from Content-Type, if any
+
+
+# One connection pool shared by every scraper in the process; created lazily
+# because aiohttp sessions must be opened inside the running event loop.
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            headers=HEADERS,
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=10, ttl_dns_cache=300),
+        )
+    return _session
+
+
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+# BeautifulSoup holds the GIL while it parses, so threads can't parse pages in
+# parallel; worker processes can. Spawned rather than forked, as the service
+# process already runs threads.
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", str(os.cpu_count() or 1)))
+_parse_pool: ProcessPoolExecutor | None = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+    _parse_pool = None
+
+
 class BaseScraper(ABC):
     def __init__(self, timeout: int = 30):
-        self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
 
     @abstractmethod
-    def scrape(self, url: str, pincode: str | None = None) -> dict:
+    async def scrape(self, url: str, pincode: str | None = None) -> dict:
         """Scrape the given URL and return structured product data."""
 
-    def _get_with_retry(self, url: str, max_retries: int = 3) -> requests.Response:
+    async def _get_with_retry(self, url: str, max_retries: int = 3) -> FetchedPage:
         if max_retries < 1:
             max_retries = 1
         last_exc: Exception = RuntimeError(f"No attempts made for {url}")
+        session = get_session()
         for attempt in range(max_retries):
             try:
-                response = self.session.get(url, timeout=self.timeout, allow_redirects=True)
-                response.raise_for_status()
-                return response
-            except requests.RequestException as exc:
+                async with session.get(url, timeout=self.timeout, allow_redirects=True) as response:
+                    response.raise_for_status()
+                    body = await self._read_capped(response)
+                    return FetchedPage(body, str(response.url), response.charset)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
                 last_exc = exc
                 wait = 2 ** attempt
                 logger.warning(
@@ -47,5 +108,31 @@ class BaseScraper(ABC):
                     exc,
                     wait,
                 )
-                time.sleep(wait)
+                await asyncio.sleep(wait)
         raise last_exc
+
+    async def _read_capped(self, response: aiohttp.ClientResponse) -> bytes:
+        """Stream the raw body, stopping at MAX_PAGE_BYTES.
+
+        Skips decoding to str; the parsers take bytes directly.
+        """
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+            body += chunk
+            if len(body) >= MAX_PAGE_BYTES:
+                logger.warning("Page %s exceeds %d bytes, truncating", response.url, MAX_PAGE_BYTES)
+                del body[MAX_PAGE_BYTES:]
+                break
+        return bytes(body)
+
+    async def _parse_in_process(self, parse: Callable, *args):
+        """Run a picklable parse function in the worker pool."""
+        global _parse_pool
+        pool = get_parse_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, parse, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for later pages
+            if _parse_pool is pool:
+                _parse_pool = None
+            raise
@@ -1,36 +1,135 @@
+import asyncio
+import codecs
 import json
 import logging
 import re
+from typing import Iterator
 
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser, LexborNode
 
 from base_scraper import BaseScraper
 
 logger = logging.getLogger(__name__)
 
+_BUY_LABEL_RE = re.compile(r"add to cart|buy now", re.I)
+_OUT_OF_STOCK_RE = re.compile(r"out of stock", re.I)
+_ADD_TO_CART_RE = re.compile(r"add to cart", re.I)
+_BUY_NOW_RE = re.compile(r"buy now", re.I)
+_AMOUNT_RE = re.compile(r"([\d,]+(?:\.\d{1,2})?)")
+_NOT_DELIVERABLE_RE = re.compile(
+    r"not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable"
+)
+_DELIVERABLE_RE = re.compile(r"delivery\s+by|delivery\s+available|deliverable")
+# Bank, card type, minimum amount and discount in one left-to-right scan.
+# The alternatives cannot overlap, so the first match of each group is the
+# same as a separate search for it, except that a minimum amount swallows
+# its own ₹ figure (handled in _extract_bank_offers).
+_OFFER_TOKEN_RE = re.compile(
+    r"(?P<bank>HDFC|SBI|ICICI|Axis|Kotak|RBL|IDFC|IndusInd|Yes Bank|AU Bank|BOB)"
+    r"|(?P<card>credit|debit)"
+    r"|min(?:imum)?\s+(?:transaction|purchase|order)?\s*(?:of\s*)?₹\s*(?P<min>[\d,]+)"
+    r"|₹\s*(?P<disc>[\d,]+)",
+    re.I,
+)
+
+# Common Flipkart price classes, in order of preference
+_PRICE_CLASSES = ("_30jeq3", "_1_WHN1", "Nx9bqj", "_16Jk6d")
+_PRICE_SELECTOR = ", ".join("." + cls for cls in _PRICE_CLASSES)
+
+# Text inside these is code or a ruby annotation, not page copy; bs4's
+# get_text skipped it, lexbor's text() does not
+_NON_VISIBLE_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+_NON_VISIBLE_SELECTOR = ", ".join(sorted(_NON_VISIBLE_TAGS))
+
+
+def _node_text(node: LexborNode, separator: str = "") -> str:
+    """Stripped text of every visible descendant string, empty ones dropped."""
+    if node.css_first(_NON_VISIBLE_SELECTOR) is None:
+        return separator.join(filter(None, node.text(separator="\x00", strip=True).split("\x00")))
+    return separator.join(_visible_strings(node))
+
+
+def _visible_strings(node: LexborNode) -> Iterator[str]:
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == "-text":
+            text = (child.text_content or "").strip()
+            if text:
+                yield text
+        elif not tag.startswith("-") and tag not in _NON_VISIBLE_TAGS:
+            yield from _visible_strings(child)
+
+
+def _safe_json(text: str):
+    """Parsed JSON, or None when the text is not valid JSON."""
+    try:
+        return json.loads(text)
+    except (ValueError, RecursionError):
+        return None
 
-class FlipkartScraper(BaseScraper):
-    def scrape(self, url: str, pincode: str | None = None) -> dict:
-        try:
-            response = self._get_with_retry(url)
-            final_url = response.url
-            soup = BeautifulSoup(response.text, "lxml")
 
-            product_name = self._extract_name(soup)
-            price = self._extract_price(soup)
-            availability = self._extract_availability(soup)
-            deliverable = self._extract_deliverability(soup, pincode)
-            bank_offers = self._extract_bank_offers(soup)
+def _collect_strings(tree: LexborHTMLParser) -> tuple[list[str], str]:
+    """Walk the document once.
 
-            return {
-                "product_name": product_name,
-                "price": price,
-                "availability": availability,
-                "deliverable": deliverable,
-                "bank_offers": bank_offers,
-                "platform": "flipkart",
-                "final_url": str(final_url),
-            }
+    Returns every raw string (text, script/style bodies and comments) for
+    phrase lookups, and the visible page text joined by single spaces.
+    """
+    strings = []
+    visible = []
+    for node in tree.root.traverse(include_text=True):
+        tag = node.tag
+        if tag == "-text":
+            text = node.text_content
+            if not text:
+                continue
+            strings.append(text)
+            if node.parent is None or node.parent.tag not in _NON_VISIBLE_TAGS:
+                stripped = text.strip()
+                if stripped:
+                    visible.append(stripped)
+        elif tag == "-comment":
+            strings.append(node.html)
+        elif tag == "template":
+            # lexbor keeps template content out of the tree, but bs4 saw its
+            # strings; reparse it for the phrase lookups (never visible)
+            strings.extend(_collect_strings(LexborHTMLParser(_template_content(node)))[0])
+    return strings, " ".join(visible)
+
+
+def _template_content(node: LexborNode) -> str:
+    """Serialized content of a <template>, without the element's own tags."""
+    html = node.html
+    quoted = False
+    for index, char in enumerate(html):
+        if char == '"':
+            quoted = not quoted
+        elif char == ">" and not quoted:
+            return html[index + 1:-len("</template>")]
+    return ""
+
+
+def _decode_for_lexbor(body: bytes, encoding: str | None) -> bytes | str:
+    """lexbor reads bytes as UTF-8 (what Flipkart serves); decode anything else."""
+    if not encoding:
+        return body
+    try:
+        codec = codecs.lookup(encoding).name
+    except LookupError:
+        # Garbage charset label in Content-Type; read the page as UTF-8
+        return body.decode("utf-8", errors="replace")
+    if codec == "utf-8":
+        return body
+    return body.decode(codec, errors="replace")
+
+
+class FlipkartScraper(BaseScraper):
+    async def scrape(self, url: str, pincode: str | None = None) -> dict:
+        try:
+            page = await self._get_with_retry(url)
+            html = _decode_for_lexbor(page.body, page.encoding)
+            # Parsing is CPU-bound; keep it off the event loop. The page is
+            # fetched the same way for every pincode, so it isn't needed here.
+            return await asyncio.to_thread(self._parse, html, page.url)
         except Exception as exc:
             logger.error("Flipkart scrape failed for %s: %s", url, exc)
             return {
@@ -43,80 +142,104 @@ class FlipkartScraper(BaseScraper):
                 "error": str(exc),
             }
 
-    def _extract_name(self, soup: BeautifulSoup):
+    def _parse(self, html: bytes | str, final_url: str) -> dict:
+        tree = LexborHTMLParser(html)
+        strings, page_text = _collect_strings(tree)
+        # Name and price both read the JSON-LD blocks; find and decode them once
+        ld_parsed = [
+            _safe_json(script.text()) for script in tree.css('script[type="application/ld+json"]')
+        ]
+
+        product_name = self._extract_name(tree, ld_parsed)
+        price = self._extract_price(tree, ld_parsed)
+        availability = self._extract_availability(tree, strings)
+        deliverable = self._extract_deliverability(page_text)
+        bank_offers = self._extract_bank_offers(tree)
+
+        return {
+            "product_name": product_name,
+            "price": price,
+            "availability": availability,
+            "deliverable": deliverable,
+            "bank_offers": bank_offers,
+            "platform": "flipkart",
+            "final_url": final_url,
+        }
+
+    def _extract_name(self, tree: LexborHTMLParser, ld_parsed: list):
         # JSON-LD
-        for script in soup.find_all("script", type="application/ld+json"):
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict) and data.get("name"):
-                    return data["name"]
-                if isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict) and item.get("name"):
-                            return item["name"]
-            except Exception:
-                pass
+        for data in ld_parsed:
+            if isinstance(data, dict) and data.get("name"):
+                return data["name"]
+            if isinstance(data, list):
+                for item in data:
+                    if isinstance(item, dict) and item.get("name"):
+                        return item["name"]
 
         # Fallback: H1 or title
-        h1 = soup.find("h1")
-        if h1:
-            return h1.get_text(strip=True)
+        h1 = tree.css_first("h1")
+        if h1 is not None:
+            return _node_text(h1)
 
-        title = soup.find("title")
-        if title:
-            return title.get_text(strip=True).split("|")[0].strip()
+        title = tree.css_first("title")
+        if title is not None:
+            return _node_text(title).split("|")[0].strip()
 
         return None
 
-    def _extract_price(self, soup: BeautifulSoup):
-        # Common Flipkart price class selectors
-        for selector in ["._30jeq3", "._1_WHN1", ".Nx9bqj", "._16Jk6d"]:
-            el = soup.select_one(selector)
-            if el:
-                text = el.get_text(strip=True)
-                parsed = self._parse_price_text(text)
-                if parsed is not None:
-                    return parsed
+    def _extract_price(self, tree: LexborHTMLParser, ld_parsed: list):
+        # One pass collects the first element of each price class; matches
+        # come back in document order, so preference is applied afterwards.
+        # A preferred element may hold no number, so every class is needed.
+        first_by_rank = {}
+        for el in tree.css(_PRICE_SELECTOR):
+            classes = (el.attributes.get("class") or "").split()
+            for rank, cls in enumerate(_PRICE_CLASSES):
+                if cls in classes:
+                    first_by_rank.setdefault(rank, el)
+            if len(first_by_rank) == len(_PRICE_CLASSES):
+                break
+        for rank in sorted(first_by_rank):
+            parsed = self._parse_price_text(_node_text(first_by_rank[rank]))
+            if parsed is not None:
+                return parsed
 
         # JSON-LD fallback
-        for script in soup.find_all("script", type="application/ld+json"):
-            try:
-                data = json.loads(script.string)
-                offers = None
-                if isinstance(data, dict):
-                    offers = data.get("offers")
-                if offers and isinstance(offers, dict):
-                    price = offers.get("price")
-                    if price:
+        for data in ld_parsed:
+            offers = None
+            if isinstance(data, dict):
+                offers = data.get("offers")
+            if offers and isinstance(offers, dict):
+                price = offers.get("price")
+                if price:
+                    try:
                         return int(float(str(price)))
-            except Exception:
-                pass
+                    except (ValueError, OverflowError):
+                        pass
 
         return None
 
-    def _extract_availability(self, soup: BeautifulSoup):
-        for node in soup.select("button, a, [role='button']"):
-            label = node.get_text(" ", strip=True)
+    def _extract_availability(self, tree: LexborHTMLParser, strings: list[str]):
+        for node in tree.css("button, a, [role='button']"):
+            label = _node_text(node, " ")
             if not label:
                 continue
-            if not re.search(r"add to cart|buy now", label, re.I):
+            if not _BUY_LABEL_RE.search(label):
                 continue
 
+            attrs = node.attributes
             is_disabled = (
-                node.has_attr("disabled")
-                or str(node.get("aria-disabled", "")).lower() == "true"
-                or "disabled" in " ".join(node.get("class", [])).lower()
+                "disabled" in attrs
+                or (attrs.get("aria-disabled") or "").lower() == "true"
+                or "disabled" in (attrs.get("class") or "").lower()
             )
             if not is_disabled:
                 return True
 
-        out_of_stock = soup.find(string=re.compile(r"out of stock", re.I))
-        if out_of_stock:
+        if any(_OUT_OF_STOCK_RE.search(text) for text in strings):
             return False
 
-        add_to_cart = soup.find(string=re.compile(r"add to cart", re.I))
-        buy_now = soup.find(string=re.compile(r"buy now", re.I))
-        if add_to_cart or buy_now:
+        if any(_ADD_TO_CART_RE.search(text) or _BUY_NOW_RE.search(text) for text in strings):
             return True
         return None
 
@@ -124,7 +247,7 @@ class FlipkartScraper(BaseScraper):
         if not text:
             return None
 
-        amount_match = re.search(r"([\d,]+(?:\.\d{1,2})?)", text)
+        amount_match = _AMOUNT_RE.search(text)
         if not amount_match:
             return None
 
@@ -136,54 +259,51 @@ class FlipkartScraper(BaseScraper):
 
         return int(round(value))
 
-    def _extract_deliverability(self, soup: BeautifulSoup, pincode: str | None):
-        page_text = soup.get_text(" ", strip=True)
+    def _extract_deliverability(self, page_text: str):
         if not page_text:
             return None
 
-        normalized = re.sub(r"\s+", " ", page_text).lower()
-        if re.search(r"not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable", normalized):
+        # The patterns take any whitespace run (\s+), so it needs no collapsing
+        normalized = page_text.lower()
+        if _NOT_DELIVERABLE_RE.search(normalized):
             return False
 
-        if pincode:
-            if re.search(rf"{re.escape(pincode)}[^.\n]{{0,40}}(not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable)", normalized):
-                return False
-            if re.search(rf"{re.escape(pincode)}[^.\n]{{0,40}}(deliverable|delivery\s+available|delivery\s+by)", normalized):
-                return True
-
-        if re.search(r"delivery\s+by|delivery\s+available|deliverable", normalized):
+        if _DELIVERABLE_RE.search(normalized):
             return True
 
         return None
 
-    def _extract_bank_offers(self, soup: BeautifulSoup):
+    def _extract_bank_offers(self, tree: LexborHTMLParser):
         offers = []
         # Look for offer sections by common class names
         # Scan at most 10 sections to avoid processing an unbounded number of DOM elements
-        offer_sections = soup.select(".XBEQ60, ._3xFhiH, .A6+aMw, [class*='offer']")
+        offer_sections = tree.css(".XBEQ60, ._3xFhiH, .A6+aMw, [class*='offer']")
         for section in offer_sections[:10]:
-            text = section.get_text(separator=" ", strip=True)
+            text = _node_text(section, " ")
             if not text:
                 continue
-            bank_match = re.search(
-                r"(HDFC|SBI|ICICI|Axis|Kotak|RBL|IDFC|IndusInd|Yes Bank|AU Bank|BOB)",
-                text,
-                re.I,
-            )
-            if not bank_match:
+            bank = card = disc = min_ = None
+            for match in _OFFER_TOKEN_RE.finditer(text):
+                group = match.lastgroup
+                if group == "bank":
+                    bank = bank or match.group("bank")
+                elif group == "card":
+                    card = card or match.group("card")
+                elif group == "min":
+                    if min_ is None:
+                        min_ = match.group("min")
+                        # No ₹ figure so far: this one is also the first discount figure
+                        disc = disc or min_
+                elif disc is None:
+                    disc = match.group("disc")
+                if bank and card and disc and min_:
+                    break
+            if not bank:
                 continue
-            bank_name = bank_match.group(1).upper()
-
-            card_match = re.search(r"(credit|debit)", text, re.I)
-            card_type = card_match.group(1).capitalize() if card_match else None
-
-            discount_match = re.search(r"₹\s*([\d,]+)", text)
-            discount_value = (
-                int(discount_match.group(1).replace(",", "")) if discount_match else None
-            )
-
-            min_match = re.search(r"min(?:imum)?\s+(?:transaction|purchase|order)?\s*(?:of\s*)?₹\s*([\d,]+)", text, re.I)
-            min_amount = int(min_match.group(1).replace(",", "")) if min_match else None
+            bank_name = bank.upper()
+            card_type = card.capitalize() if card else None
+            discount_value = int(disc.replace(",", "")) if disc else None
+            min_amount = int(min_.replace(",", "")) if min_ else None
 
             offers.append(
                 {
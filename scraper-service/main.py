@@ -1,10 +1,13 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from base_scraper import close_session, shutdown_parse_pool
 from flipkart_scraper import FlipkartScraper
 from vivo_scraper import VivoScraper
 
@@ -18,7 +21,15 @@ logger = logging.getLogger(__name__)
 
 SCRAPER_TIMEOUT = int(os.getenv("SCRAPER_TIMEOUT", "30"))
 
-app = FastAPI(title="Scraper Service", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_session()
+    shutdown_parse_pool()
+
+
+app = FastAPI(title="Scraper Service", version="1.0.0", lifespan=lifespan)
 
 _scrapers = {
     "flipkart": FlipkartScraper(timeout=SCRAPER_TIMEOUT),
@@ -38,12 +49,37 @@ def health():
 
 
 @app.post("/scrape")
-def scrape(payload: ScrapeRequest):
+async def scrape(payload: ScrapeRequest):
     platform = payload.platform.lower()
     scraper = _scrapers.get(platform)
     if scraper is None:
         raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
 
     logger.info("Scraping %s url=%s", platform, payload.url)
-    result = scraper.scrape(payload.url, pincode=payload.pincode)
+    result = await scraper.scrape(payload.url, pincode=payload.pincode)
     return result
+
+
+@app.post("/scrape_batch")
+async def scrape_batch(payload: list[ScrapeRequest]):
+    """Scrape many URLs concurrently; results align with the request by index."""
+    return await asyncio.gather(*(_scrape_one(item) for item in payload))
+
+
+async def _scrape_one(item: ScrapeRequest) -> dict:
+    platform = item.platform.lower()
+    scraper = _scrapers.get(platform)
+    if scraper is None:
+        # One bad item must not fail the whole batch
+        return {
+            "product_name": None,
+            "price": None,
+            "availability": None,
+            "deliverable": None,
+            "bank_offers": [],
+            "platform": platform,
+            "error": f"Unsupported platform: {platform}",
+        }
+
+    logger.info("Scraping %s url=%s", platform, item.url)
+    return await scraper.scrape(item.url, pincode=item.pincode)
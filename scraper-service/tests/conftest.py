@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The service runs its modules flat from /app; mirror that for the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,30 @@
+from flipkart_scraper import FlipkartScraper
+
+
+def parse(html: str) -> dict:
+    return FlipkartScraper()._parse(html, "https://www.flipkart.com/p")
+
+
+def test_script_inside_button_does_not_split_buy_label():
+    html = "<html><body><button>Buy <script>x</script>Now</button></body></html>"
+    assert parse(html)["availability"] is True
+
+
+def test_script_and_style_text_is_not_part_of_the_name():
+    html = "<html><body><h1>Widget<style>h1{}</style> <script>track()</script>Pro</h1></body></html>"
+    assert parse(html)["product_name"] == "WidgetPro"
+
+
+def test_stock_phrase_inside_template_still_counts():
+    html = "<html><body><template><span>Out of stock</span></template></body></html>"
+    assert parse(html)["availability"] is False
+
+
+def test_price_falls_through_to_later_class_when_preferred_has_no_number():
+    html = (
+        "<html><body>"
+        '<div class="_30jeq3">Price</div><div class="_1_WHN1">₹999</div>'
+        '<script type="application/ld+json">{"offers": {"price": "1499"}}</script>'
+        "</body></html>"
+    )
+    assert parse(html)["price"] == 999
@@ -0,0 +1,54 @@
+from vivo_scraper import VivoScraper
+
+
+def parse(html: str) -> dict:
+    return VivoScraper()._parse(html.encode(), "utf-8")
+
+
+def test_enabled_buy_button_is_available():
+    html = "<html><body><button>Add to Cart</button><p>Out of stock</p></body></html>"
+    assert parse(html)["availability"] is True
+
+
+def test_comment_inside_enabled_link_is_not_a_buy_label():
+    html = (
+        "<html><body>"
+        '<a href="/cart"><!-- add to cart --></a>'
+        "<p>Out of stock</p>"
+        "</body></html>"
+    )
+    assert parse(html)["availability"] is False
+
+
+def test_script_inside_enabled_link_is_not_a_buy_label():
+    html = (
+        "<html><body>"
+        '<a href="/cart"><script>track("buy now")</script></a>'
+        "<p>Out of stock</p>"
+        "</body></html>"
+    )
+    assert parse(html)["availability"] is False
+
+
+def test_buy_label_outside_any_button_still_counts_when_in_stock():
+    html = "<html><body><p>Buy now and save</p></body></html>"
+    assert parse(html)["availability"] is True
+
+
+def test_reads_content_outside_common_text_containers():
+    # Price, stock and delivery copy in tables, headers and footers,
+    # custom elements and loose body text all count
+    html = (
+        "<html><head><title>Phone | vivo</title></head><body>"
+        "<header><nav><a href='/'>Home</a></nav></header>"
+        "<table><tr><td class='price'>₹ 19,999</td></tr></table>"
+        "<vivo-stock><i>Out of stock</i></vivo-stock>"
+        "Delivery by Friday"
+        "<footer><font>Free shipping</font></footer>"
+        "</body></html>"
+    )
+    result = parse(html)
+    assert result["product_name"] == "Phone"
+    assert result["price"] == 19999
+    assert result["availability"] is False
+    assert result["deliverable"] is True
@@ -1,33 +1,183 @@
-import json
+import hashlib
 import logging
 import re
+from collections import OrderedDict
+from typing import Iterator, NamedTuple
 
-from bs4 import BeautifulSoup
+import orjson
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 
 from base_scraper import BaseScraper
 
 logger = logging.getLogger(__name__)
 
+# Fixed phrases, matched case-insensitively with plain substring checks
+_BUY_LABELS = ("buy now", "add to cart")
+_OUT_OF_STOCK = "out of stock"
+_AMOUNT_RE = re.compile(r"([\d,]+(?:\.\d{1,2})?)")
+# Negative and positive delivery phrases, classified in a single pass
+_DELIVERY_RE = re.compile(
+    r"(?P<neg>not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable)"
+    r"|(?P<pos>delivery\s+by|delivery\s+available|deliverable)"
+)
+# Containers of the delivery/pincode widget (class or id containing one of
+# these); scanning these instead of the whole page keeps the text fed to
+# the regexes small
+_DELIVERY_SCOPE_WORDS = ("delivery", "pincode")
+# Less scoped text than this means the widget wasn't found; use the full page
+_MIN_SCOPED_TEXT = 50
+
+
+def _load_json(text: str) -> object:
+    # orjson only takes exact str/bytes, not bs4's NavigableString subclass
+    return orjson.loads(text.encode())
+
+
+class _PageScan(NamedTuple):
+    # Every string, scripts and comments included, as soup.find(string=...)
+    # sees them; for the stock phrase checks
+    strings: list[NavigableString]
+    # Only the strings get_text reads; buy labels are walked up from these
+    visible_strings: list[NavigableString]
+    page_text: str  # visible text, as soup.get_text(" ", strip=True)
+    clickables: list[Tag]  # button, a and role="button"
+    delivery_nodes: list[Tag]
+    jsonld_scripts: list[Tag]
+    # First .price, first .product-price, first [class*='price'], in that
+    # order of preference; missing ones are left out
+    price_nodes: list[Tag]
+    h1: Tag | None  # first <h1>
+    title: Tag | None  # first <title>
+
+
+def _scan_page(soup: BeautifulSoup) -> _PageScan:
+    """Walk the document once, gathering what every extractor needs."""
+    strings = []
+    visible_strings = []
+    visible = []
+    clickables = []
+    delivery_nodes = []
+    jsonld_scripts = []
+    first_price = first_product_price = first_price_like = None
+    h1 = title = None
+    for node in soup.descendants:
+        if isinstance(node, NavigableString):
+            strings.append(node)
+            # Exact types: get_text skips Script, Comment and the like
+            if type(node) is NavigableString or type(node) is CData:
+                visible_strings.append(node)
+                text = node.strip()
+                if text:
+                    visible.append(text)
+            continue
+        classes = node.get("class", [])
+        class_attr = " ".join(classes)
+        if _is_clickable(node):
+            clickables.append(node)
+        if _in_delivery_scope(class_attr, node.get("id", "")):
+            delivery_nodes.append(node)
+        if "price" in class_attr:
+            if first_price_like is None:
+                first_price_like = node
+            if first_price is None and "price" in classes:
+                first_price = node
+            if first_product_price is None and "product-price" in classes:
+                first_product_price = node
+        if node.name == "script" and node.get("type") == "application/ld+json":
+            jsonld_scripts.append(node)
+        elif node.name == "h1" and h1 is None:
+            h1 = node
+        elif node.name == "title" and title is None:
+            title = node
+    price_nodes = [
+        node for node in (first_price, first_product_price, first_price_like) if node is not None
+    ]
+    return _PageScan(
+        strings=strings,
+        visible_strings=visible_strings,
+        page_text=" ".join(visible),
+        clickables=clickables,
+        delivery_nodes=delivery_nodes,
+        jsonld_scripts=jsonld_scripts,
+        price_nodes=price_nodes,
+        h1=h1,
+        title=title,
+    )
+
+
+def _in_delivery_scope(class_attr: str, node_id: str) -> bool:
+    return any(word in class_attr or word in node_id for word in _DELIVERY_SCOPE_WORDS)
+
+
+class _JsonLd:
+    """The page's JSON-LD objects, decoded only as far as they are read.
+
+    The name is usually in the first block, so the rest are decoded only
+    when the price falls back to JSON-LD. Invalid blocks are skipped.
+    """
+
+    def __init__(self, scripts: list[Tag]):
+        self._scripts = iter(scripts)
+        self._objects: list[dict] = []
+
+    def __iter__(self) -> Iterator[dict]:
+        index = 0
+        while True:
+            if index < len(self._objects):
+                yield self._objects[index]
+                index += 1
+                continue
+            script = next(self._scripts, None)
+            if script is None:
+                return
+            try:
+                data = _load_json(script.string)
+            except Exception:
+                continue
+            if isinstance(data, dict):
+                self._objects.append(data)
+
+
+def _has_buy_label(text: str) -> bool:
+    folded = text.casefold()
+    return any(label in folded for label in _BUY_LABELS)
+
+
+def _is_clickable(node: Tag) -> bool:
+    return node.name in ("button", "a") or node.get("role") == "button"
+
+
+def _is_disabled(node: Tag) -> bool:
+    return (
+        node.has_attr("disabled")
+        or str(node.get("aria-disabled", "")).lower() == "true"
+        or "disabled" in " ".join(node.get("class", [])).lower()
+    )
+
+
+# (blake2b of the page bytes, charset) -> parse result. The same bytes always
+# parse the same, so entries never go stale; the bound only caps memory.
+PARSE_CACHE_SIZE = 1024
+_parsed_pages: "OrderedDict[tuple[bytes, str | None], dict]" = OrderedDict()
+
 
 class VivoScraper(BaseScraper):
-    def scrape(self, url: str, pincode: str | None = None) -> dict:
+    async def scrape(self, url: str, pincode: str | None = None) -> dict:
         try:
-            response = self._get_with_retry(url)
-            soup = BeautifulSoup(response.text, "lxml")
-
-            product_name = self._extract_name(soup)
-            price = self._extract_price(soup)
-            availability = self._extract_availability(soup)
-            deliverable = self._extract_deliverability(soup, pincode)
+            page = await self._get_with_retry(url)
+            key = (hashlib.blake2b(page.body, digest_size=16).digest(), page.encoding)
+            result = _parsed_pages.get(key)
+            if result is not None:
+                _parsed_pages.move_to_end(key)
+                return dict(result)
 
-            return {
-                "product_name": product_name,
-                "price": price,
-                "availability": availability,
-                "deliverable": deliverable,
-                "bank_offers": [],
-                "platform": "vivo",
-            }
+            # Parsing is CPU-bound; run it in a worker process. The page is
+            # the same for every pincode, so it isn't needed for parsing.
+            result = await self._parse_in_process(self._parse, page.body, page.encoding)
+            _parsed_pages[key] = result
+            if len(_parsed_pages) > PARSE_CACHE_SIZE:
+                _parsed_pages.popitem(last=False)
+            return dict(result)
         except Exception as exc:
             logger.error("Vivo scrape failed for %s: %s", url, exc)
             return {
@@ -40,80 +190,93 @@ class VivoScraper(BaseScraper):
                 "error": str(exc),
             }
 
-    def _extract_name(self, soup: BeautifulSoup):
+    def _parse(self, html: bytes, encoding: str | None) -> dict:
+        # Raw bytes let lxml do the one decode, in C
+        soup = BeautifulSoup(html, "lxml", from_encoding=encoding or "utf-8")
+        scan = _scan_page(soup)
+        jsonld = _JsonLd(scan.jsonld_scripts)
+
+        product_name = self._extract_name(scan, jsonld)
+        price = self._extract_price(scan, jsonld)
+        availability = self._extract_availability(scan)
+        deliverable = self._extract_deliverability(scan)
+
+        return {
+            "product_name": product_name,
+            "price": price,
+            "availability": availability,
+            "deliverable": deliverable,
+            "bank_offers": [],
+            "platform": "vivo",
+        }
+
+    def _extract_name(self, scan: _PageScan, jsonld: "_JsonLd") -> str | None:
         # Try JSON-LD first
-        for script in soup.find_all("script", type="application/ld+json"):
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict) and data.get("name"):
-                    return data["name"]
-            except Exception:
-                pass
+        for data in jsonld:
+            if data.get("name"):
+                return data["name"]
 
-        h1 = soup.find("h1")
-        if h1:
-            return h1.get_text(strip=True)
+        if scan.h1 is not None:
+            return scan.h1.get_text(strip=True)
 
-        title = soup.find("title")
-        if title:
-            return title.get_text(strip=True).split("|")[0].strip()
+        if scan.title is not None:
+            return scan.title.get_text(strip=True).split("|")[0].strip()
 
         return None
 
-    def _extract_price(self, soup: BeautifulSoup):
-        # Common patterns on Vivo IN site
-        for selector in [".price", ".product-price", "[class*='price']"]:
-            el = soup.select_one(selector)
-            if el:
-                text = el.get_text(strip=True)
-                parsed = self._parse_price_text(text)
-                if parsed is not None:
-                    return parsed
-
-        for script in soup.find_all("script", type="application/ld+json"):
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict):
-                    offers = data.get("offers", {})
-                    if isinstance(offers, dict):
-                        price = offers.get("price")
-                        if price:
-                            return int(float(str(price)))
-            except Exception:
-                pass
+    def _extract_price(self, scan: _PageScan, jsonld: "_JsonLd") -> int | None:
+        # Common patterns on Vivo IN site, collected during the page walk
+        for el in scan.price_nodes:
+            parsed = self._parse_price_text(el.get_text(strip=True))
+            if parsed is not None:
+                return parsed
+
+        for data in jsonld:
+            offers = data.get("offers", {})
+            if isinstance(offers, dict):
+                price = offers.get("price")
+                if price:
+                    try:
+                        return int(float(str(price)))
+                    except (ValueError, OverflowError):
+                        pass
 
         return None
 
-    def _extract_availability(self, soup: BeautifulSoup):
-        for node in soup.select("button, a, [role='button']"):
+    def _extract_availability(self, scan: _PageScan) -> bool | None:
+        # Fast path: walk up from the visible strings that carry a buy label.
+        # This finds enabled buttons without reading every link's text; a
+        # comment or script mentioning "add to cart" is not a label.
+        for string in scan.visible_strings:
+            if not _has_buy_label(string):
+                continue
+            for node in string.parents:
+                if _is_clickable(node) and not _is_disabled(node):
+                    return True
+
+        # Labels split across elements ("Buy <span>Now</span>") only match
+        # on the joined text
+        for node in scan.clickables:
             label = node.get_text(" ", strip=True)
             if not label:
                 continue
-            if not re.search(r"buy now|add to cart", label, re.I):
+            if not _has_buy_label(label):
                 continue
-
-            is_disabled = (
-                node.has_attr("disabled")
-                or str(node.get("aria-disabled", "")).lower() == "true"
-                or "disabled" in " ".join(node.get("class", [])).lower()
-            )
-            if not is_disabled:
+            if not _is_disabled(node):
                 return True
 
-        out_of_stock = soup.find(string=re.compile(r"out of stock", re.I))
-        if out_of_stock:
+        if any(_OUT_OF_STOCK in string.casefold() for string in scan.strings):
             return False
 
-        buy_btn = soup.find(string=re.compile(r"buy now|add to cart", re.I))
-        if buy_btn:
+        if any(_has_buy_label(string) for string in scan.strings):
             return True
         return None
 
-    def _parse_price_text(self, text: str):
+    def _parse_price_text(self, text: str) -> int | None:
         if not text:
             return None
 
-        amount_match = re.search(r"([\d,]+(?:\.\d{1,2})?)", text)
+        amount_match = _AMOUNT_RE.search(text)
         if not amount_match:
             return None
 
@@ -125,22 +288,19 @@ class VivoScraper(BaseScraper):
 
         return int(round(value))
 
-    def _extract_deliverability(self, soup: BeautifulSoup, pincode: str | None):
-        page_text = soup.get_text(" ", strip=True)
+    def _extract_deliverability(self, scan: _PageScan) -> bool | None:
+        page_text = " ".join(node.get_text(" ", strip=True) for node in scan.delivery_nodes)
+        if len(page_text) < _MIN_SCOPED_TEXT:
+            page_text = scan.page_text
         if not page_text:
             return None
 
-        normalized = re.sub(r"\s+", " ", page_text).lower()
-        if re.search(r"not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable", normalized):
-            return False
-
-        if pincode:
-            if re.search(rf"{re.escape(pincode)}[^.\n]{{0,40}}(not\s+deliverable|delivery\s+not\s+available|cannot\s+be\s+delivered|unserviceable)", normalized):
+        # The patterns take any whitespace run (\s+), so it needs no collapsing
+        normalized = page_text.lower()
+        # Any negative phrase wins; otherwise any positive one means deliverable
+        deliverable = None
+        for match in _DELIVERY_RE.finditer(normalized):
+            if match.lastgroup == "neg":
                 return False
-            if re.search(rf"{re.escape(pincode)}[^.\n]{{0,40}}(deliverable|delivery\s+available|delivery\s+by)", normalized):
-                return True
-
-        if re.search(r"delivery\s+by|delivery\s+available|deliverable", normalized):
-            return True
-
-        return None
+            deliverable = True
+        return deliverable